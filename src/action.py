@@ -77,7 +77,8 @@ class ControlOperator(Enum):
     DO_WHILE = auto()
     TRY = auto()
 
-type ActionExecutable = Action | ActionGroup | ActionControlNode | DeferredAction
+# Plan nodes are never modified while being executed, so a single node may be referenced from several places in a plan.
+type ActionExecutable = Action | ActionGroup | ActionControlNode | DeferredAction | ContextBoundAction
 
 class MetaAction(Enum):
     CREATE_ITEM_RESERVATION = auto()
@@ -93,24 +94,28 @@ class MetaAction(Enum):
 
     FAIL_OUT = auto()
 
-@dataclass
+@dataclass(slots=True)
 class Action:
     """A command to be executed."""
     type: CharacterAction | MetaAction
     params: Dict[str, Any] = field(default_factory=dict)
 
-@dataclass
+@dataclass(slots=True)
 class ActionGroup:
     """A group or sequence of actions to be completed."""
-    actions: List[ActionExecutable] = field(default_factory=list)
+    actions: Tuple[ActionExecutable, ...] = ()
 
-@dataclass
+    def __post_init__(self):
+        # Groups may be shared between plans, so store actions as a tuple
+        self.actions = tuple(self.actions)
+
+@dataclass(frozen=True, slots=True)
 class ActionControlNode:
     """A sequencing control node determinine action flow such as conditions or repetition."""
     control_operator: ControlOperator
     node: ActionExecutable| None = None
 
-    branches: List[Tuple[ActionConditionExpression, ActionExecutable]] | None = None
+    branches: Tuple[Tuple[ActionConditionExpression, ActionExecutable], ...] | None = None
     fail_path: ActionExecutable | None = None
 
     condition: ActionConditionExpression | None = None
@@ -132,9 +137,8 @@ class ActionControlNode:
             assert(self.finally_path is None)
         
         if self.control_operator == ControlOperator.WHILE or self.control_operator == ControlOperator.DO_WHILE:
-            # A child node and until condition must be defined
+            # A child node must be defined, note that a loop without a condition repeats forever
             assert(self.node)
-            assert(self.condition)
             
             # There should be no decision branches or fail_path defined
             assert(self.branches is None)
@@ -152,11 +156,19 @@ class ActionControlNode:
             assert(self.fail_path is None)
             assert(self.condition is None)
 
-@dataclass
+@dataclass(slots=True)
 class DeferredAction:
     resolver: Callable[["CharacterAgent"], ActionExecutable]
 
-@dataclass(frozen=True)
+@dataclass(slots=True)
+class ContextBoundAction:
+    """An action built by `factory` with one parameter read from the agent's context at execution time."""
+    factory: Callable[..., ActionExecutable]
+    context_key: str
+    param: str = "items"
+    params: Dict[str, Any] = field(default_factory=dict)
+
+@dataclass(frozen=True, slots=True)
 class ActionConditionExpression:
     """A condition or set of conditions subject to logical operations."""
     operator: LogicalOperator | None = None
@@ -184,6 +196,6 @@ class ActionConditionExpression:
     def is_leaf(self) -> bool:
         return self.condition is not None
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class DeferredCondition:
     resolver: Callable[["CharacterAgent"], ActionConditionExpression]
\ No newline at end of file
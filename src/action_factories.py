@@ -1,4 +1,4 @@
-from typing import List
+from typing import Iterable, Tuple
 from src.action import *
 
 ## Grouping Factory
@@ -14,8 +14,15 @@ def fail_action() -> Action:
 ## Base Action Factories
 
 # Movement
-def move(**params) -> Action:
-    return Action(CharacterAction.MOVE, params=params)
+def move(*, x: int | None = None, y: int | None = None, closest_of: Iterable[Tuple[int, int]] | None = None, previous: bool = False) -> Action:
+    # Explicit keywords so a misspelt target fails loudly instead of producing a move to nowhere
+    if previous:
+        return Action(CharacterAction.MOVE, params={"previous": True})
+    
+    if closest_of is not None:
+        return Action(CharacterAction.MOVE, params={"closest_of": closest_of})
+
+    return Action(CharacterAction.MOVE, params={"x": x, "y": y})
 
 def transition(**params) -> Action:
     raise NotImplementedError()
@@ -59,12 +66,20 @@ def bank_withdraw_gold(**params) -> Action:
 
 # Custom Banking
 
-def bank_all_items(exclude: List[str] = []) -> Action:
-    return Action(CharacterAction.BANK_DEPOSIT_ITEM, params={"deposit_all": True, "exclude": exclude})
+def bank_all_items(exclude: Iterable[str] | None = None) -> Action:
+    return Action(CharacterAction.BANK_DEPOSIT_ITEM, params={"deposit_all": True, "exclude": tuple(exclude or ())})
 
 def bank_all_gold() -> Action:
     return Action(CharacterAction.BANK_DEPOSIT_GOLD, params={"preset": "all"})
 
+# Deposit everything and withdraw in a single trip to the bank
+def bank_session(locations, withdraw: ActionExecutable, exclude: Iterable[str] | None = None) -> ActionGroup:
+    return group(
+        move(closest_of=locations),
+        bank_all_items(exclude=exclude),
+        withdraw
+    )
+
 # Tasks
 def get_task() -> Action:
     return Action(CharacterAction.GET_TASK)
@@ -43,7 +43,7 @@ class APIClient:
 
     ## Get Character/Player Data
     async def get_characters(self) -> dict:
-        response = await self._client.get(f"/my/characters")
+        response = await self._client.get("/my/characters")
         response.raise_for_status()
         return response.json()
 
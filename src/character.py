@@ -9,7 +9,7 @@ from math import floor, ceil
 from src.action import Action, ActionOutcome, CharacterAction
 from src.api import APIClient, RequestOutcome, RequestOutcomeDetail
 from src.worldstate import WorldState
-from src.helpers import SKILLS, ItemOrder, ItemType
+from src.helpers import SKILLS, ItemOrder, ItemSelection, ItemType, TaskType
 
 if TYPE_CHECKING:
     from src.scheduler import ActionScheduler
@@ -28,13 +28,15 @@ class CharacterAgent:
             "previous_location": (self.char_data["x"],  self.char_data["y"]),
             "equip_queue": [],
             "damage_taken_last_fight": self.char_data["max_hp"],
-            "last_trade": {},
-            "last_craft": {},
             "prepared_loadout": [],
             "bank_deposit_exclusions": []
         }
         self.world_state = world_state
 
+        # Results of the most recent task trade and craft, read by plans every loop iteration
+        self.last_trade_quantity: int = 0
+        self.last_craft_quantity: int = 0
+
         self.is_autonomous: bool = False
         self.abort_actions: bool = False
         self.cooldown_expires_at: float = datetime.strptime(self.char_data.get("cooldown_expiration", "1970-01-01T00:00:00.000Z"), "%Y-%m-%dT%H:%M:%S.%fZ").timestamp()
@@ -89,11 +91,13 @@ class CharacterAgent:
                     case ItemType.FOOD:
                         best_food = self.world_state.get_best_food_for_character_in_bank(self.char_data)
                         if best_food:
-                            item.item = best_food[0]
+                            item = ItemSelection(item=best_food[0], quantity=item.quantity)
                         else:
                             return []
 
-        for item in order.items:
+            true_order.append(item)
+
+        for item in true_order:
             i = item.item
             inv[i] = self.get_quantity_of_item_in_inventory(i)
             bank[i] = self.world_state.get_amount_of_item_in_bank(i)
@@ -269,12 +273,12 @@ class CharacterAgent:
     def has_task(self) -> bool:
         return self.char_data["task"] != ""
     
-    def has_task_of_type(self, task_type: str) -> bool:
-        if task_type == "fighting":
+    def has_task_of_type(self, task_type: TaskType) -> bool:
+        if task_type == TaskType.FIGHTING:
             return self.world_state.is_a_monster(self.char_data["task"])
-        elif task_type == "gathering":
+        elif task_type == TaskType.GATHERING:
             return not self.world_state.item_is_craftable(self.char_data["task"])
-        elif task_type == "crafting":
+        elif task_type == TaskType.CRAFTING:
             return self.world_state.item_is_craftable(self.char_data["task"])
         else:
             raise Exception(f"Unknown task type: {task_type}.")
@@ -501,11 +505,11 @@ class CharacterAgent:
 
             # Check for trade data
             if trade_data := api_result.response.get("data", {}).get("trade"):
-                self.context["last_trade"] = trade_data
+                self.last_trade_quantity = trade_data["quantity"]
 
             # Check for craft data
             if craft_data := api_result.response.get("data", {}).get("details", {}).get("items"):
-                self.context["last_craft"] = craft_data[0]
+                self.last_craft_quantity = craft_data[0]["quantity"]
 
             # Update character state
             if new_char_data := api_result.response.get("data", {}).get("character"):
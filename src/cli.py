@@ -11,6 +11,7 @@ from src.api import APIClient
 from src.scheduler import ActionScheduler
 from src.planner import ActionPlanner, ActionIntent, Intention
 from src.worldstate import WorldState
+from src.helpers import TaskType
 
 def get_token() -> str:
     with open("token.txt", 'r') as f:
@@ -346,9 +347,9 @@ def parse_input(planner: ActionPlanner, scheduler: ActionScheduler, world: World
                 return
             
             if args[0] == "monsters":
-                node = planner.plan(ActionIntent(Intention.COMPLETE_TASKS, type="monsters"))
+                node = planner.plan(ActionIntent(Intention.COMPLETE_TASKS, task_type=TaskType.FIGHTING))
             elif args[0] == "items":
-                node = planner.plan(ActionIntent(Intention.COMPLETE_TASKS, type="items"))
+                node = planner.plan(ActionIntent(Intention.COMPLETE_TASKS, task_type=TaskType.ITEMS))
             else:
                 return
             
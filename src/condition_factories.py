@@ -1,14 +1,30 @@
+from functools import lru_cache
 from typing import List, Tuple, Dict, Any
 
 from src.action import ActionCondition, ActionConditionExpression, LogicalOperator, ActionControlNode
 
 # Generic Condition Factory
-def cond(condition: ActionCondition, **params) -> ActionConditionExpression:
+@lru_cache(maxsize=256)
+def _interned_cond(condition: ActionCondition, params: Tuple[Tuple[str, type, Any], ...]) -> ActionConditionExpression:
     return ActionConditionExpression(
         condition=condition,
-        parameters=params
+        parameters={ key: value for key, _, value in params }
     )
 
+def cond(condition: ActionCondition, **params) -> ActionConditionExpression:
+    # Expressions are immutable, so ones with the same hashable parameters are shared.
+    # Values are tagged with their type so that e.g. 1, 1.0 and True aren't merged.
+    interning_key = tuple((key, type(value), value) for key, value in sorted(params.items()))
+    try:
+        hash(interning_key)
+    except TypeError:
+        return ActionConditionExpression(
+            condition=condition,
+            parameters=params
+        )
+
+    return _interned_cond(condition, interning_key)
+
 # Operator Factories
 def NOT(expr: ActionConditionExpression) -> ActionConditionExpression:
     return ActionConditionExpression(
@@ -28,6 +44,10 @@ def OR(*exprs: ActionConditionExpression) -> ActionConditionExpression:
         children=list(exprs)
     )
 
+def _all_of(exprs: List[ActionConditionExpression]) -> ActionConditionExpression:
+    # A single condition doesn't need wrapping in an AND
+    return exprs[0] if len(exprs) == 1 else AND(*exprs)
+
 ## Complex Condition Factories
 
 # Items in Inventory
@@ -39,15 +59,7 @@ def cond__item_qty_in_inv(item: str, quantity: int) -> ActionConditionExpression
     )
 
 def cond__items_in_inv(items: List[Dict[str, Any]]) -> ActionConditionExpression:
-    if len(items) == 1:
-        item = items[0]["code"]
-        quantity = items[0]["quantity"]
-        return cond__item_qty_in_inv(item, quantity)
-    else:
-        return AND(*[
-            cond__item_qty_in_inv(item["code"], item["quantity"])
-            for item in items
-        ])
+    return _all_of([cond__item_qty_in_inv(item["code"], item["quantity"]) for item in items])
 
 def cond__inv_has_space_for_items(items: List[Dict[str, Any]]) -> ActionConditionExpression:
     return cond(
@@ -64,15 +76,7 @@ def cond__item_qty_in_bank(item: str, quantity: int)-> ActionConditionExpression
     )
 
 def cond__items_in_bank(items: List[Dict[str, Any]]) -> ActionConditionExpression:
-    if len(items) == 1:
-        item = items[0]["code"]
-        quantity = items[0]["quantity"]
-        return cond__item_qty_in_bank(item, quantity)
-    else:
-        return AND(*[
-            cond__item_qty_in_bank(item["code"], item["quantity"])
-            for item in items
-        ])
+    return _all_of([cond__item_qty_in_bank(item["code"], item["quantity"]) for item in items])
 
 # Items in Inventory or Bank
 def cond__item_qty_in_inv_and_bank(item: str, quantity: int) -> ActionConditionExpression:
@@ -83,12 +87,4 @@ def cond__item_qty_in_inv_and_bank(item: str, quantity: int) -> ActionConditionE
     )
 
 def cond__items_in_inv_and_bank(items: List[Dict[str, Any]]) -> ActionConditionExpression:
-    if len(items) == 1:
-        item = items[0]["code"]
-        quantity = items[0]["quantity"]
-        return cond__item_qty_in_inv_and_bank(item, quantity)
-    else:
-        return AND(*[
-            cond__item_qty_in_inv_and_bank(item["code"], item["quantity"])
-            for item in items
-        ])
\ No newline at end of file
+    return _all_of([cond__item_qty_in_inv_and_bank(item["code"], item["quantity"]) for item in items])
\ No newline at end of file
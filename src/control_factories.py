@@ -9,14 +9,16 @@ def IF(*branches: Tuple[ActionConditionExpression, ActionExecutable], fail_path:
         fail_path=fail_path
     )
 
-def WHILE(node: ActionExecutable, condition: ActionConditionExpression) -> ActionControlNode:
+def WHILE(node: ActionExecutable, condition: ActionConditionExpression | None = None) -> ActionControlNode:
+    """Repeat `node` while `condition` holds, checking it before each run. Without a condition, repeat until `node` fails or the actions are aborted."""
     return ActionControlNode(
         control_operator = ControlOperator.WHILE,
         node=node,
         condition=condition
     )
 
-def DO_WHILE(node: ActionExecutable, condition: ActionConditionExpression) -> ActionControlNode:
+def DO_WHILE(node: ActionExecutable, condition: ActionConditionExpression | None = None) -> ActionControlNode:
+    """Run `node`, then repeat it while `condition` holds. Without a condition, repeat until `node` fails or the actions are aborted."""
     return ActionControlNode(
         control_operator = ControlOperator.DO_WHILE,
         node=node,
@@ -2,19 +2,29 @@ from __future__ import annotations
 
 import math
 from dataclasses import dataclass
-from enum import Enum, auto
-from typing import List
+from enum import Enum, IntEnum, auto
+from typing import List, Tuple
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ItemOrder:
-    items: List[ItemSelection]
+    items: Tuple[ItemSelection, ...]
     greedy_order: bool = False
     check_inv: bool = False
 
+    def __post_init__(self):
+        # Store selections as a tuple so orders can be hashed
+        object.__setattr__(self, "items", tuple(self.items))
+
 class ItemType(Enum):
     FOOD = auto()
 
-@dataclass
+class TaskType(IntEnum):
+    FIGHTING = 1
+    GATHERING = 2
+    CRAFTING = 3
+    ITEMS = 4
+
+@dataclass(frozen=True, slots=True)
 class ItemSelection:
     quantity: ItemQuantity
     item: str | None = None
@@ -22,15 +32,9 @@ class ItemSelection:
 
     def __post_init__(self):
         # Only allow item xor item_type
-        assert(self.item or self.item_type)
-
-        if self.item:
-            assert(not self.item_type)
-
-        if self.item_type:
-            assert(not self.item)
+        assert(bool(self.item) != bool(self.item_type))
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ItemQuantity:
     min: int | None = None
     max: int | None = None
@@ -41,15 +45,14 @@ class ItemQuantity:
         assert((self.max is not None and self.max > 0) or (self.min is not None and self.min > 0) or self.multiple_of)
 
         # If both min and max are assigned, min must be no larger than max
-        if self.min and self.max:
-            assert(self.min <= self.max)
+        assert(not (self.min and self.max) or self.min <= self.max)
 
         # If not defined, set min to -INF and max to +INF
         if not self.max:
-            self.max = math.inf
+            object.__setattr__(self, "max", math.inf)
 
         if not self.min:
-            self.min = -math.inf
+            object.__setattr__(self, "min", -math.inf)
         
 ARMOUR_SLOTS = ["shield", "helmet", "body_armor", "leg_armor", "boots", "ring", "amulet"]
 SKILLS = ["mining", "woodcutting", "fishing", "weaponcrafting", "gearcrafting", "jewelrycrafting", "cooking", "alchemy"]
@@ -1,18 +1,42 @@
 from __future__ import annotations
 
 import logging
-from typing import Dict, List, Any
-from dataclasses import dataclass
-from enum import Enum, auto
+from functools import lru_cache
+from operator import itemgetter
+from typing import TYPE_CHECKING, Callable, Dict, List, Tuple, Any
+from dataclasses import dataclass, fields, replace
+from enum import IntEnum, auto
 
 from src.action import *
 from src.condition_factories import *
 from src.control_factories import *
 from src.action_factories import *
-from src.worldstate import WorldState
+from src.worldstate import WorldState, LocationSet
 from src.helpers import *
 
-class Intention(Enum):
+if TYPE_CHECKING:
+    from src.character import CharacterAgent
+
+## Shared plan fragments
+_NO_TASK = NOT(cond(ActionCondition.HAS_TASK))
+_TASK_NOT_COMPLETE = NOT(cond(ActionCondition.TASK_COMPLETE))
+_NEEDS_FIGHT_REFILL = OR(
+    cond(ActionCondition.INVENTORY_FULL), 
+    AND(
+        NOT(cond(ActionCondition.INVENTORY_CONTAINS_USABLE_FOOD)),
+        cond(ActionCondition.BANK_CONTAINS_USABLE_FOOD)
+    )
+)
+
+_RESERVE_PREPARED_LOADOUT = DeferredAction(lambda agent: add_item_reservations(name=agent.name, items=agent.context["prepared_loadout"]))
+_RELEASE_PREPARED_LOADOUT = DeferredAction(lambda agent: clear_item_reservations(name=agent.name, items=[i["code"]for i in agent.context["prepared_loadout"]]))
+_WITHDRAW_PREPARED_LOADOUT = ContextBoundAction(bank_withdraw_item, "prepared_loadout")
+_EQUIP_QUEUED_ITEMS = WHILE(
+    equip(use_queue=True),
+    condition=cond(ActionCondition.ITEMS_IN_EQUIP_QUEUE)
+)
+
+class Intention(IntEnum):
     # Basic Intention
     MOVE = auto()
     TRANSITION = auto()
@@ -56,432 +80,694 @@ class Intention(Enum):
 
     CRAFT_UNTIL_LEVEL = auto()
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ActionIntent:
     intention: Intention
-    params: Dict[str, Any]
     until: ActionConditionExpression | None = None
 
-    def __init__(self, intention: Intention, until: ActionConditionExpression | None = None, **params: Any):
-        self.intention = intention
-        self.params = params
-        self.until = until
+    # Movement
+    x: int | None = None
+    y: int | None = None
+    previous: bool = False
+
+    # Items and crafting
+    item: str | None = None
+    items: List[ItemSelection] | ItemOrder | None = None
+    quantity: int = 1
+    slot: str | None = None
+    preset: str | None = None
+    as_many_as_possible: bool = False
+    craft_max: bool = False
+    gather_intermediaries: bool = False
+    level: int | None = None
+
+    # Tasks
+    task_type: TaskType | None = None
+    target: str | None = None
+    monster: str | None = None
+    resource: str | None = None
+    condition: ActionConditionExpression | DeferredCondition | None = None
+
+class NodeIdentity:
+    """Wraps a value for use in a structural key, where it only matches the very same object."""
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __hash__(self) -> int:
+        return id(self.value)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, NodeIdentity) and other.value is self.value
 
 class ActionPlanner:
     """Interprets action intent and generates action plans."""
+    # Upper bound on plans kept in each plan cache, as quantities in parameters are unbounded
+    MAX_CACHED_PLANS = 256
+
+    # Upper bound on canonical nodes kept for sharing between plans
+    MAX_INTERNED_NODES = 4096
+
     def __init__(self, world_state: WorldState):
         self.logger = logging.getLogger(__name__)
 
         self.world_state = world_state
+        self.world_state.subscribe(self.invalidate)
+        self._load_world_lookups()
 
-    def plan(self, intent: ActionIntent) -> ActionExecutable:
-        match intent.intention:
-            # Basic Intentions
-            case Intention.MOVE:
-                return move(**intent.params)
-            
-            case Intention.TRANSITION:
-                raise NotImplementedError()
-            
-            case Intention.FIGHT:                
-                return group(
-                    DO_WHILE(
-                        IF(
-                            (
-                                cond(ActionCondition.INVENTORY_CONTAINS_USABLE_FOOD),
-                                use(item_type="food")
-                            ),
-                            fail_path=rest()
-                        ),
-                        condition=cond(ActionCondition.HEALTH_LOW_ENOUGH_TO_EAT)
-                    ),
-                    fight()
-                )
+        # Location lookups for the target of each preparable task type
+        self._locations_by_task: Dict[TaskType, Callable[[str], LocationSet]] = {
+            TaskType.FIGHTING: lambda monster: self._locations_of_monster(monster),
+            TaskType.GATHERING: lambda resource: self._locations_of_resource(resource)
+        }
 
-            case Intention.REST:
-                return rest()
-            
-            case Intention.GATHER:
-                return gather()
-            
-            case Intention.CRAFT:
-                item: str = intent.params.get("item")
-                quantity: int = intent.params.get("quantity")
-                skill_workshop = self.world_state.get_workshop_for_item(item)
-                workshop_locations = self.world_state.get_workshop_locations(skill_workshop)
+        # Canonical plan nodes, keyed by their structure, so identical subtrees are shared between plans
+        self._interned_nodes: Dict[Tuple, ActionExecutable] = {}
 
-                return group(
-                    move(closest_of=workshop_locations),
-                    craft(item=item, quantity=quantity)
-                )
-            
-            case Intention.EQUIP:
-                return equip()
-            
-            case Intention.UNEQUIP:
-                return unequip()
-            
-            case Intention.USE:
-                raise NotImplementedError()
-            
-            case Intention.WITHDRAW_ITEMS:
-                items: ItemOrder = intent.params.get("items")
-                bank_locations = self.world_state.get_bank_locations()
+        # Plans for intentions which take no parameters never change, so are built once
+        self._static_plans: Dict[Intention, ActionExecutable] = self._build_static_plans()
+
+        # Built on first use, as it depends on task masters which not every world has
+        self._task_completion_plan: ActionExecutable | None = None
+
+        # Plan builders for each intention, called with the intent being planned
+        self._handlers: Dict[Intention, Callable[[ActionIntent], ActionExecutable]] = {
+            # Basic Intentions
+            Intention.MOVE: lambda intent: self._plan_move(x=intent.x, y=intent.y, previous=intent.previous),
+            Intention.TRANSITION: self._plan_not_implemented,
+            Intention.CRAFT: lambda intent: self._plan_craft(
+                item=intent.item,
+                quantity=intent.quantity,
+                as_many_as_possible=intent.as_many_as_possible
+            ),
+            Intention.USE: self._plan_not_implemented,
+            Intention.WITHDRAW_ITEMS: lambda intent: self._plan_withdraw_items(items=intent.items),
+            Intention.DEPOSIT_ITEMS: lambda intent: self._plan_deposit_items(
+                items=intent.items,
+                preset=intent.preset
+            ),
+            Intention.WITHDRAW_GOLD: lambda intent: self._plan_withdraw_gold(quantity=intent.quantity),
+            Intention.DEPOSIT_GOLD: lambda intent: self._plan_deposit_gold(quantity=intent.quantity),
 
-                return group(
-                    move(closest_of=bank_locations),
-                    bank_withdraw_item(items=items)
-                )
-            
-            case Intention.DEPOSIT_ITEMS:
-                bank_locations = self.world_state.get_bank_locations()
-                match intent.params.get("preset", "none"):
-                    case "all":
-                        return group(
-                            move(closest_of=bank_locations),
-                            bank_deposit_item(preset="all")
-                        )
-                    
-                    case _:
-                        items: List[ItemSelection] = intent.params.get("items")
-                        return group(
-                            move(closest_of=bank_locations),
-                            bank_deposit_item(items=items)
-                        )
-                    
-            case Intention.DEPOSIT_ALL_AT_BANK:
-                bank_locations = self.world_state.get_bank_locations()
-                return group(
-                    move(closest_of=bank_locations),
-                    bank_all_items()
-                )
-            
-            case Intention.WITHDRAW_GOLD:
-                bank_locations = self.world_state.get_bank_locations()
-                quantity: int = intent.params.get("quantity")
-                return group(
-                    move(closest_of=bank_locations),
-                    bank_withdraw_gold(quantity=quantity)
-                )
-            
-            case Intention.DEPOSIT_GOLD:
-                bank_locations = self.world_state.get_bank_locations()
-                quantity: int = intent.params.get("quantity")
-                return group(
-                    move(closest_of=bank_locations),
-                    bank_deposit_gold(quantity=quantity)
-                )
-            
             # General Worker Intentions
-            case Intention.PREPARE_FOR_TASK:
-                task_type = intent.params.get("task_type")
-                target = intent.params.get("target")
+            Intention.PREPARE_FOR_TASK: lambda intent: self._plan_prepare_for_task(
+                task_type=intent.task_type,
+                target=intent.target
+            ),
+            Intention.FIGHT_MONSTERS: lambda intent: self._plan_fight_monsters(
+                monster=intent.monster,
+                condition=intent.condition
+            ),
+            Intention.GATHER_RESOURCES: lambda intent: self._plan_gather_resources(
+                resource=intent.resource,
+                condition=intent.condition
+            ),
 
-                if task_type == "fighting":
-                    locations = self.world_state.get_locations_of_monster(target)
-                elif task_type == "gathering":
-                    locations = self.world_state.get_locations_of_resource(target)
-                else:
-                    raise Exception(f"Unknown task type for prepare for: {task_type}")
+            # Task Execution
+            Intention.MOVE_TO_TASK_MASTER: lambda intent: self._plan_move_to_task_master(task_type=intent.task_type),
+            Intention.COMPLETE_TASKS: lambda intent: self._plan_complete_tasks(task_type=intent.task_type),
+            Intention.PLAN_TASK_COMPLETION: lambda intent: self._get_task_completion_plan(),
+            Intention.COMPLETE_MONSTER_TASK: lambda intent: self._plan_complete_monster_task(),
+            Intention.COMPLETE_ITEM_TASK_GATHERING: lambda intent: self._plan_complete_item_task_gathering(),
+            Intention.COMPLETE_ITEM_TASK_CRAFTING: lambda intent: self._plan_complete_item_task_crafting(),
+            Intention.TURN_IN_ITEM_TASK_ITEMS: lambda intent: self._plan_turn_in_item_task_items(),
+
+            # Complex Intentions
+            Intention.BANK_THEN_RETURN: lambda intent: self._plan_bank_then_return(
+                items=intent.items,
+                preset=intent.preset
+            ),
+            Intention.COLLECT_THEN_CRAFT: lambda intent: self._plan_collect_then_craft(
+                item=intent.item,
+                quantity=intent.quantity,
+                craft_max=intent.craft_max,
+                gather_intermediaries=intent.gather_intermediaries
+            ),
+            Intention.CRAFT_OR_GATHER_INTERMEDIARIES: lambda intent: self._plan_collect_then_craft(
+                item=intent.item,
+                quantity=intent.quantity,
+                craft_max=intent.craft_max,
+                gather_intermediaries=True
+            )
+        }
+
+        # Compiled COLLECT_THEN_CRAFT plans, keyed by the typed (item, quantity, craft_max, gather_intermediaries)
+        self._collect_then_craft_cache: Dict[Tuple, ActionExecutable] = {}
+
+        # Plans for working on a task, keyed by (intention, task target)
+        self._task_plan_cache: Dict[Tuple[Intention, str], ActionExecutable] = {}
+
+        # Plans for any intent whose parameters are all hashable, keyed by the intent's typed fields
+        self._plan_cache: Dict[Tuple, ActionExecutable] = {}
+
+    def _load_world_lookups(self):
+        # Map and recipe data don't change during a session, so lookups made while planning are memoized
+        self._bank_locations = self.world_state.get_bank_locations()
+        self._task_master_locations = self.world_state.get_task_master_locations()
+        self._locations_of_monster = lru_cache(maxsize=None)(self.world_state.get_locations_of_monster)
+        self._locations_of_resource = lru_cache(maxsize=None)(self.world_state.get_locations_of_resource)
+        self._recipe_for_item = lru_cache(maxsize=None)(self._load_recipe)
+
+        # Every bank plan starts with the same move
+        self._move_to_bank = move(closest_of=self._bank_locations)
+
+        # Moving to a task master only depends on the type of task
+        self._task_master_moves: Dict[TaskType, ActionExecutable] = {
+            task_type: move(closest_of=locations) for task_type, locations in self._task_master_locations.items()
+        }
+
+    def _load_recipe(self, item: str) -> Tuple[Tuple[str, ...], Tuple[int, ...]]:
+        # Split a recipe into its material codes and quantities
+        required_materials = self.world_state.get_crafting_materials_for_item(item)
+        if not required_materials:
+            return (), ()
+
+        material_codes, material_quantities = zip(*map(itemgetter("code", "quantity"), required_materials))
+        return material_codes, material_quantities
+
+    def _build_static_plans(self) -> Dict[Intention, ActionExecutable]:
+        return {
+            intention: self._intern(plan) for intention, plan in {
+                Intention.FIGHT: self._plan_fight(),
+                Intention.REST: rest(),
+                Intention.GATHER: gather(),
+                Intention.EQUIP: equip(),
+                Intention.UNEQUIP: unequip(),
+                Intention.DEPOSIT_ALL_AT_BANK: self._plan_deposit_all_at_bank()
+            }.items()
+        }
+
+    def invalidate(self):
+        """Discard memoized world lookups and cached plans, for when the world's map or recipe data changes."""
+        self._load_world_lookups()
+        self._interned_nodes.clear()
+        self._static_plans = self._build_static_plans()
+        self._task_completion_plan = None
+        self._collect_then_craft_cache.clear()
+        self._task_plan_cache.clear()
+        self._plan_cache.clear()
 
-                return group(
-                    self.plan(ActionIntent(Intention.DEPOSIT_ALL_AT_BANK)),
-                    DeferredAction(lambda agent: prepare_best_loadout(character=agent.char_data, task=task_type, target=target)),
-                    DeferredAction(lambda agent: add_item_reservations(name=agent.name, items=agent.context["prepared_loadout"])),
-                    TRY(
-                        group(
-                            DeferredAction(lambda agent: bank_withdraw_item(items=agent.context["prepared_loadout"])),
-                            WHILE(
-                                equip(use_queue=True),
-                                condition=cond(ActionCondition.ITEMS_IN_EQUIP_QUEUE)
-                            ),
-                            bank_all_items(),
-                            move(closest_of=locations)
-                        ),
-                        error_path=clear_prepared_loadout(),
-                        finally_path=DeferredAction(lambda agent: clear_item_reservations(name=agent.name, items=[i["code"]for i in agent.context["prepared_loadout"]]))
-                    )
-                )
-            
-            case Intention.FIGHT_MONSTERS:
-                monster = intent.params.get("monster")
-                condition = intent.params.get("condition")
-                prepare_action = self.plan(ActionIntent(Intention.PREPARE_FOR_TASK, task_type="fighting", target=monster))
+    def plan(self, intent: ActionIntent) -> ActionExecutable:
+        static_plan = self._static_plans.get(intent.intention)
+        if static_plan is not None:
+            return static_plan
+        
+        cache_key = self._plan_cache_key(intent)
+        try:
+            cached_plan = self._plan_cache.get(cache_key)
+        except TypeError:
+            # Parameters such as item lists or conditions can't be hashed, so are always planned fresh
+            return self._build_plan(intent)
+        
+        if cached_plan is None:
+            cached_plan = self._build_plan(intent)
+            self._cache_plan(self._plan_cache, cache_key, cached_plan)
 
-                return group(
-                    prepare_action,
-                    WHILE(
-                        group(
-                            IF(
-                                (
-                                    OR(
-                                        cond(ActionCondition.INVENTORY_FULL), 
-                                        AND(
-                                            NOT(cond(ActionCondition.INVENTORY_CONTAINS_USABLE_FOOD)),
-                                            cond(ActionCondition.BANK_CONTAINS_USABLE_FOOD)
-                                        )
-                                    ), 
-                                    prepare_action
-                                )
-                            ),
-                            self.plan(ActionIntent(Intention.FIGHT))
-                        ),
-                        condition=condition
-                    )
-                )
-            
-            case Intention.GATHER_RESOURCES:
-                resource = intent.params.get("resource")
-                condition = intent.params.get("condition")
-                prepare_action = self.plan(ActionIntent(Intention.PREPARE_FOR_TASK, task_type="gathering", target=resource))
+        return cached_plan
 
-                return group(
-                    prepare_action,
-                    WHILE(
-                        group(
-                            IF(
-                                (
-                                    cond(ActionCondition.INVENTORY_FULL),
-                                    prepare_action
-                                )
-                            ),
-                            self.plan(ActionIntent(Intention.GATHER))
-                        ),
-                        condition=condition
-                    )
+    def _plan_cache_key(self, intent: ActionIntent) -> Tuple:
+        return self._typed_key(*(getattr(intent, field.name) for field in fields(intent)))
+
+    def _typed_key(self, *values: Any) -> Tuple:
+        # Tag values with their type so that e.g. 1, 1.0 and True don't share a cache entry
+        return tuple((type(value), value) for value in values)
+
+    def _cache_plan(self, cache: Dict[Any, ActionExecutable], key: Any, plan: ActionExecutable):
+        # Evict the oldest plan once the cache is full
+        if len(cache) >= self.MAX_CACHED_PLANS:
+            del cache[next(iter(cache))]
+
+        cache[key] = plan
+
+    def _build_plan(self, intent: ActionIntent) -> ActionExecutable:
+        handler = self._handlers.get(intent.intention)
+        if handler is None:
+            raise Exception("Unknown action type.")
+        
+        return self._intern(handler(intent))
+
+    def _intern(self, node: ActionExecutable) -> ActionExecutable:
+        """Return the canonical instance of a node's structure, interning its children first."""
+        match node:
+            case Action():
+                key = (Action, node.type, tuple((name, self._key_part(value)) for name, value in node.params.items()))
+
+            case ActionGroup():
+                node = ActionGroup(actions=tuple(self._intern(action) for action in node.actions))
+                key = (ActionGroup, tuple(NodeIdentity(action) for action in node.actions))
+
+            case ActionControlNode():
+                node = replace(
+                    node,
+                    node=self._intern_optional(node.node),
+                    branches=tuple((condition, self._intern(action)) for condition, action in node.branches) if node.branches else None,
+                    fail_path=self._intern_optional(node.fail_path),
+                    success_path=self._intern_optional(node.success_path),
+                    error_path=self._intern_optional(node.error_path),
+                    finally_path=self._intern_optional(node.finally_path)
                 )
-            
-            # Task Execution
-            case Intention.MOVE_TO_TASK_MASTER:
-                task_type = intent.params.get("task_type")
-                task_master_locations = self.world_state.get_task_master_locations().get(task_type)
-                return move(closest_of=task_master_locations)
-
-            case Intention.COMPLETE_TASKS:
-                task_type = intent.params.get("type")
-                move_to_task_master = self.plan(ActionIntent(Intention.MOVE_TO_TASK_MASTER, task_type=task_type))
-                
-                return DO_WHILE(
-                    group(
-                        IF(
-                            (
-                                NOT(cond(ActionCondition.HAS_TASK)), 
-                                group(
-                                    move_to_task_master,
-                                    get_task()
-                                )
-                            ),
-                            (
-                                cond(ActionCondition.TASK_COMPLETE), 
-                                group(
-                                    move_to_task_master,
-                                    complete_task(),
-                                    get_task()
-                                )
-                            )
-                        ),
-                        self.plan(ActionIntent(Intention.PLAN_TASK_COMPLETION))
-                    ),
-                    condition=cond(ActionCondition.FOREVER)
+                key = (
+                    ActionControlNode,
+                    node.control_operator,
+                    tuple((NodeIdentity(condition), NodeIdentity(action)) for condition, action in node.branches or ()),
+                    *(NodeIdentity(value) for value in (node.node, node.fail_path, node.condition, node.success_path, node.error_path, node.finally_path))
                 )
-                
-            case Intention.PLAN_TASK_COMPLETION:
-                return IF(
+
+            case _:
+                # Deferred nodes are resolved at execution time, so are only ever shared by reference
+                return node
+
+        interned = self._interned_nodes.get(key)
+        if interned is None:
+            if len(self._interned_nodes) >= self.MAX_INTERNED_NODES:
+                self._interned_nodes.clear()
+
+            interned = self._interned_nodes[key] = node
+
+        return interned
+
+    def _intern_optional(self, node: ActionExecutable | None) -> ActionExecutable | None:
+        return self._intern(node) if node is not None else None
+
+    def _key_part(self, value: Any) -> Any:
+        try:
+            hash(value)
+        except TypeError:
+            return NodeIdentity(value)
+
+        return (type(value), value)
+
+    def _plan_not_implemented(self, intent: ActionIntent) -> ActionExecutable:
+        raise NotImplementedError()
+
+    ## Basic Intentions
+    def _plan_fight(self) -> ActionExecutable:
+        return group(
+            DO_WHILE(
+                IF(
                     (
-                        cond(ActionCondition.HAS_TASK_OF_TYPE, task_type="fighting"),
-                        self.plan(ActionIntent(Intention.COMPLETE_MONSTER_TASK))
+                        cond(ActionCondition.INVENTORY_CONTAINS_USABLE_FOOD),
+                        use(item_type="food")
+                    ),
+                    fail_path=rest()
+                ),
+                condition=cond(ActionCondition.HEALTH_LOW_ENOUGH_TO_EAT)
+            ),
+            fight()
+        )
+
+    def _plan_move(self, x: int | None = None, y: int | None = None, previous: bool = False) -> ActionExecutable:
+        if previous:
+            return move(previous=True)
+        
+        return move(x=x, y=y)
+
+    def _plan_craft(self, item: str, quantity: int, as_many_as_possible: bool = False) -> ActionExecutable:
+        workshop_locations = self.world_state.get_workshop_locations_for_item(item)
+
+        if as_many_as_possible:
+            # Craft as many as the materials in the inventory allow
+            material_codes, material_quantities = self._recipe_for_item(item)
+            craft_action = DeferredAction(lambda agent: craft(item=item, quantity=min(
+                (agent.get_quantity_of_item_in_inventory(code) // qty for code, qty in zip(material_codes, material_quantities)),
+                default=0
+            )))
+        else:
+            craft_action = craft(item=item, quantity=quantity)
+
+        return group(
+            move(closest_of=workshop_locations),
+            craft_action
+        )
+
+    def _plan_withdraw_items(self, items: ItemOrder) -> ActionExecutable:
+        return group(
+            self._move_to_bank,
+            bank_withdraw_item(items=items)
+        )
+
+    def _plan_deposit_items(self, items: List[ItemSelection], preset: str | None = None) -> ActionExecutable:
+        if preset == "all":
+            return self._static_plans[Intention.DEPOSIT_ALL_AT_BANK]
+
+        return group(
+            self._move_to_bank,
+            bank_deposit_item(items=items)
+        )
+
+    def _plan_withdraw_gold(self, quantity: int) -> ActionExecutable:
+        return group(
+            self._move_to_bank,
+            bank_withdraw_gold(quantity=quantity)
+        )
+
+    def _plan_deposit_gold(self, quantity: int) -> ActionExecutable:
+        return group(
+            self._move_to_bank,
+            bank_deposit_gold(quantity=quantity)
+        )
+
+    def _plan_deposit_all_at_bank(self) -> ActionExecutable:
+        return group(
+            self._move_to_bank,
+            bank_all_items()
+        )
+
+    def _plan_bank_session(self, withdraw: ActionExecutable) -> ActionExecutable:
+        # Interning swaps the session's move for the shared move to the bank
+        return self._intern(bank_session(locations=self._bank_locations, withdraw=withdraw))
+
+    ## General Worker Intentions
+    def _plan_prepare_for_task(self, task_type: TaskType, target: str) -> ActionExecutable:
+        get_locations = self._locations_by_task.get(task_type)
+        if get_locations is None:
+            raise Exception(f"Unknown task type for prepare for: {task_type}")
+
+        locations = get_locations(target)
+
+        return group(
+            self._static_plans[Intention.DEPOSIT_ALL_AT_BANK],
+            DeferredAction(lambda agent: prepare_best_loadout(character=agent.char_data, task=task_type, target=target)),
+            _RESERVE_PREPARED_LOADOUT,
+            TRY(
+                group(
+                    _WITHDRAW_PREPARED_LOADOUT,
+                    _EQUIP_QUEUED_ITEMS,
+                    bank_all_items(),
+                    move(closest_of=locations)
+                ),
+                error_path=clear_prepared_loadout(),
+                finally_path=_RELEASE_PREPARED_LOADOUT
+            )
+        )
+
+    def _plan_fight_monsters(self, monster: str, condition: ActionConditionExpression | DeferredCondition) -> ActionExecutable:
+        prepare_action = self._plan_prepare_for_task(task_type=TaskType.FIGHTING, target=monster)
+
+        return group(
+            prepare_action,
+            WHILE(
+                group(
+                    IF(
+                        (
+                            _NEEDS_FIGHT_REFILL, 
+                            prepare_action
+                        )
+                    ),
+                    self._static_plans[Intention.FIGHT]
+                ),
+                condition=condition
+            )
+        )
+
+    def _plan_gather_resources(self, resource: str, condition: ActionConditionExpression | DeferredCondition) -> ActionExecutable:
+        prepare_action = self._plan_prepare_for_task(task_type=TaskType.GATHERING, target=resource)
+
+        return group(
+            prepare_action,
+            WHILE(
+                group(
+                    IF(
+                        (
+                            cond(ActionCondition.INVENTORY_FULL),
+                            prepare_action
+                        )
                     ),
+                    self._static_plans[Intention.GATHER]
+                ),
+                condition=condition
+            )
+        )
+
+    ## Task Execution
+    def _plan_move_to_task_master(self, task_type: TaskType) -> ActionExecutable:
+        if task_type not in self._task_master_moves:
+            raise KeyError(f"There is no task master for {task_type.name.lower()} tasks.")
+        
+        return self._task_master_moves[task_type]
+
+    def _plan_complete_tasks(self, task_type: TaskType) -> ActionExecutable:
+        # Both branches reference the same nodes rather than building their own copies
+        move_to_task_master = self._plan_move_to_task_master(task_type=task_type)
+        get_task_action = get_task()
+        
+        return DO_WHILE(
+            group(
+                IF(
                     (
-                        cond(ActionCondition.HAS_TASK_OF_TYPE, task_type="gathering"),
-                        self.plan(ActionIntent(Intention.COMPLETE_ITEM_TASK_GATHERING))
+                        _NO_TASK, 
+                        group(
+                            move_to_task_master,
+                            get_task_action
+                        )
                     ),
                     (
-                        cond(ActionCondition.HAS_TASK_OF_TYPE, task_type="crafting"),
-                        self.plan(ActionIntent(Intention.COMPLETE_ITEM_TASK_CRAFTING))
-                    )
-                )
-
-            case Intention.COMPLETE_MONSTER_TASK:
-                fight_action = DeferredAction(lambda agent:
-                    self.plan(ActionIntent(
-                        Intention.FIGHT_MONSTERS,
-                        monster=agent.get_task_target(),
-                        condition=NOT(cond(ActionCondition.TASK_COMPLETE))
-                    ))
-                )
-
-                return fight_action
-            
-            case Intention.COMPLETE_ITEM_TASK_GATHERING:
-                gather_action = DeferredAction(lambda agent:
-                    self.plan(ActionIntent(
-                        Intention.GATHER_RESOURCES,
-                        resource=agent.get_task_target(),
-                        condition=DeferredCondition(lambda agent:
-                            NOT(cond(
-                                ActionCondition.BANK_AND_INVENTORY_HAVE_ITEM_OF_QUANTITY,
-                                item=agent.get_task_target(),
-                                quantity=agent.get_task_quantity_remaining()
-                            ))
-                        ))
+                        cond(ActionCondition.TASK_COMPLETE), 
+                        group(
+                            move_to_task_master,
+                            complete_task(),
+                            get_task_action
+                        )
                     )
+                ),
+                self._get_task_completion_plan()
+            )
+        )
+
+    def _get_task_completion_plan(self) -> ActionExecutable:
+        if self._task_completion_plan is None:
+            self._task_completion_plan = self._intern(self._plan_task_completion())
+
+        return self._task_completion_plan
+
+    def _plan_task_completion(self) -> ActionExecutable:
+        return IF(
+            (
+                cond(ActionCondition.HAS_TASK_OF_TYPE, task_type=TaskType.FIGHTING),
+                self._plan_complete_monster_task()
+            ),
+            (
+                cond(ActionCondition.HAS_TASK_OF_TYPE, task_type=TaskType.GATHERING),
+                self._plan_complete_item_task_gathering()
+            ),
+            (
+                cond(ActionCondition.HAS_TASK_OF_TYPE, task_type=TaskType.CRAFTING),
+                self._plan_complete_item_task_crafting()
+            )
+        )
+
+    def _plan_complete_monster_task(self) -> ActionExecutable:
+        return DeferredAction(self._resolve_monster_task)
+
+    def _plan_complete_item_task_gathering(self) -> ActionExecutable:
+        return group(
+            DeferredAction(self._resolve_item_task_gathering),
+            self._plan_turn_in_item_task_items()
+        )
+
+    def _plan_complete_item_task_crafting(self) -> ActionExecutable:
+        return group(
+            DeferredAction(self._resolve_item_task_crafting),
+            self._plan_turn_in_item_task_items()
+        )
+
+    def _resolve_task_plan(self, intention: Intention, target: str, build: Callable[[str], ActionExecutable]) -> ActionExecutable:
+        # These plans only depend on the task's target, so one is kept per target
+        cache_key = (intention, target)
+        if cache_key not in self._task_plan_cache:
+            self._cache_plan(self._task_plan_cache, cache_key, self._intern(build(target)))
+
+        return self._task_plan_cache[cache_key]
+
+    def _resolve_monster_task(self, agent: CharacterAgent) -> ActionExecutable:
+        return self._resolve_task_plan(
+            Intention.COMPLETE_MONSTER_TASK,
+            agent.get_task_target(),
+            lambda monster: self._plan_fight_monsters(monster=monster, condition=_TASK_NOT_COMPLETE)
+        )
+
+    def _resolve_item_task_gathering(self, agent: CharacterAgent) -> ActionExecutable:
+        return self._resolve_task_plan(
+            Intention.COMPLETE_ITEM_TASK_GATHERING,
+            agent.get_task_target(),
+            lambda resource: self._plan_gather_resources(resource=resource, condition=DeferredCondition(self._task_items_not_collected))
+        )
+
+    def _task_items_not_collected(self, agent: CharacterAgent) -> ActionConditionExpression:
+        return NOT(cond(
+            ActionCondition.BANK_AND_INVENTORY_HAVE_ITEM_OF_QUANTITY,
+            item=agent.get_task_target(),
+            quantity=agent.get_task_quantity_remaining()
+        ))
+
+    def _resolve_item_task_crafting(self, agent: CharacterAgent) -> ActionExecutable:
+        return IF(
+            (
+                self._task_items_not_collected(agent),
+                self._plan_collect_then_craft(
+                    item=agent.get_task_target(),
+                    quantity=agent.get_task_quantity_remaining() - agent.world_state.get_amount_of_item_in_bank(agent.get_task_target()),
+                    gather_intermediaries=True
                 )
+            )
+        )
+
+    def _plan_turn_in_item_task_items(self) -> ActionExecutable:
+        return group(
+            DeferredAction(lambda agent: add_item_reservations(
+                name=agent.name, 
+                items=[{ "code": agent.get_task_target(), "quantity": agent.get_task_quantity_remaining() }]
+            )),
+            WHILE(
+                group(
+                    self._plan_bank_session(
+                        withdraw=DeferredAction(lambda agent: bank_withdraw_item(items=ItemOrder(items=[ItemSelection(item=agent.get_task_target(), quantity=ItemQuantity(max=min(agent.get_task_quantity_remaining(), agent.get_free_inventory_spaces())))]), reserve=False))
+                    ),
+                    # Only looked up when an item task is turned in, so worlds without an items task master can still plan
+                    DeferredAction(lambda agent: self._plan_move_to_task_master(task_type=TaskType.ITEMS)),
+                    DeferredAction(lambda agent: task_trade(item=agent.get_task_target(), quantity=agent.get_quantity_of_item_in_inventory(agent.get_task_target()))),
+                    DeferredAction(lambda agent: update_item_reservations(
+                        name=agent.name,
+                        items=[{ "code": agent.get_task_target(), "quantity": -agent.last_trade_quantity }]
+                    )),
+                ),
+                condition=_TASK_NOT_COMPLETE
+            )
+        )
+
+    ## Complex Intentions
+    def _plan_bank_then_return(self, items: List[ItemSelection], preset: str | None = None) -> ActionExecutable:
+        if preset == "all":
+            bank_action = bank_all_items()
+        else:
+            bank_action = bank_deposit_item(items=items)
+
+        return group(
+            self._move_to_bank,
+            bank_action,
+            move(previous=True)
+        )
+
+    def _plan_collect_then_craft(self, item: str, quantity: int = 1, craft_max: bool = False, gather_intermediaries: bool = False) -> ActionExecutable:
+        # The plan only depends on these parameters and static recipe data, so it can be reused
+        cache_key = self._typed_key(item, quantity, craft_max, gather_intermediaries)
+        if cache_key in self._collect_then_craft_cache:
+            return self._collect_then_craft_cache[cache_key]
+
+        material_codes, material_quantities = self._recipe_for_item(item)
+        if not material_codes:
+            # Nothing needs collecting, so just go and craft
+            return self._plan_craft(item=item, quantity=quantity, as_many_as_possible=craft_max)
+
+        total_materials = sum(material_quantities)
+
+        context_counter = f"counter_craft_{item}"
+
+        def scale_recipe(inv_size: int) -> List[Tuple[str, int]]:
+            # Scale the recipe by the number of crafts that fit in the inventory
+            craftable_sets = inv_size // total_materials
+            factor = craftable_sets if craft_max else min(quantity, craftable_sets)
+            return [(code, qty * factor) for code, qty in zip(material_codes, material_quantities)]
+        
+        def plan_craft_loop(agent: CharacterAgent) -> ActionExecutable:
+            # Scale the recipe once per resolution and share it between the steps of the loop
+            inv_size = agent.get_inventory_size()
+            scaled_mats = scale_recipe(inv_size)
+            req_mats = [{ "code": code, "quantity": qty } for code, qty in scaled_mats]
+
+            if gather_intermediaries:
+                # Each material's gather plan is only built if the agent reaches it
+                insufficient_mats_action = DeferredAction(lambda agent: group(*[
+                    DeferredAction(lambda agent, code=code, qty=qty: self._plan_collect_material(code, qty))
+                    for code, qty in scaled_mats
+                ]))
+            else:
+                insufficient_mats_action = fail_action()
+
+            target_quantity = quantity if not craft_max else inv_size // total_materials
+
+            def plan_fetch_mats(agent: CharacterAgent) -> ActionExecutable:
+                # The same withdrawal is used whether or not the inventory is banked first
+                withdraw_mats = bank_withdraw_item(items=req_mats)
 
                 return group(
-                    gather_action,
-                    self.plan(ActionIntent(Intention.TURN_IN_ITEM_TASK_ITEMS))
-                )
-            
-            case Intention.COMPLETE_ITEM_TASK_CRAFTING:
-                return group(
-                    DeferredAction(lambda agent:
+                    add_item_reservations(name=agent.name, items=req_mats),
+                    TRY(
                         IF(
                             (
-                                NOT(cond(ActionCondition.BANK_AND_INVENTORY_HAVE_ITEM_OF_QUANTITY, item=agent.get_task_target(), quantity=agent.get_task_quantity_remaining())),
-                                self.plan(ActionIntent(
-                                    Intention.CRAFT_OR_GATHER_INTERMEDIARIES,
-                                    item=agent.get_task_target(),
-                                    quantity=agent.get_task_quantity_remaining() - agent.world_state.get_amount_of_item_in_bank(agent.get_task_target())
-                                ))
-                            )
-                        )
-                    ),
-                    self.plan(ActionIntent(Intention.TURN_IN_ITEM_TASK_ITEMS))
-                )
-            
-            case Intention.TURN_IN_ITEM_TASK_ITEMS:
-                return group(
-                    DeferredAction(lambda agent: add_item_reservations(
-                        name=agent.name, 
-                        items=[{ "code": agent.get_task_target(), "quantity": agent.get_task_quantity_remaining() }]
-                    )),
-                    WHILE(
-                        group(
-                            self.plan(ActionIntent(Intention.DEPOSIT_ALL_AT_BANK)),   
-                            DeferredAction(lambda agent: bank_withdraw_item(items=ItemOrder(items=[ItemSelection(item=agent.get_task_target(), quantity=ItemQuantity(max=min(agent.get_task_quantity_remaining(), agent.get_free_inventory_spaces())))]), reserve=False)),
-                            self.plan(ActionIntent(Intention.MOVE_TO_TASK_MASTER, task_type="items")),
-                            DeferredAction(lambda agent: task_trade(item=agent.get_task_target(), quantity=agent.get_quantity_of_item_in_inventory(agent.get_task_target()))),
-                            DeferredAction(lambda agent: update_item_reservations(
-                                name=agent.name,
-                                items=[{ "code": agent.get_task_target(), "quantity": -agent.context["last_trade"]["quantity"] }]
-                            )),
+                                NOT(cond__inv_has_space_for_items(req_mats)),
+                                self._plan_bank_session(withdraw=withdraw_mats)
+                            ),
+                            fail_path=group(self._move_to_bank, withdraw_mats)
                         ),
-                        condition=NOT(cond(ActionCondition.TASK_COMPLETE))
+                        finally_path=clear_item_reservations(
+                            name=agent.name, 
+                            items=[i["code"] for i in req_mats]
+                        )
                     )
                 )
-            
-            # Complex Intentions             
-            case Intention.BANK_THEN_RETURN:
-                if intent.params.get("preset") == "all":
-                    bank_action = bank_all_items()
-                else:
-                    items: List[ItemSelection] = intent.params.get("items")
-                    bank_action = bank_deposit_item(items=items)
-        
-                bank_locations = self.world_state.get_bank_locations()
-                return group(
-                    move(closest_of=bank_locations),
-                    bank_action,
-                    move(previous=True)
-                )
-            
-            case Intention.COLLECT_THEN_CRAFT:
-                craft_item = intent.params.get("item")
-                craft_qty = intent.params.get("quantity", 1)
-                craft_max = intent.params.get("craft_max", False)
-                gather_intermediaries = intent.params.get("gather_intermediaries", False)
-
-                required_materials = self.world_state.get_crafting_materials_for_item(craft_item)
-                total_materials = sum(i["quantity"] for i in required_materials)
 
-                context_counter = f"counter_craft_{craft_item}"
-
-                augment_req_mats = lambda inv_size: [
-                    { "code": m["code"], "quantity": m["quantity"] * (min(craft_qty, inv_size // total_materials) if not craft_max else inv_size // total_materials) } 
-                    for m in required_materials
-                ]
-
-                if gather_intermediaries:
-                    insufficient_mats_action = DeferredAction(lambda agent: group(*[
-                        IF(
-                            (
-                                cond(ActionCondition.RESOURCE_FROM_FIGHTING, resource=material["code"]),
-                                DeferredAction(lambda agent: self.plan(ActionIntent(
-                                    Intention.FIGHT_MONSTERS, 
-                                    monster=agent.world_state._drop_sources[material["code"]][0],
-                                    condition=NOT(cond__item_qty_in_inv_and_bank(material["code"], material["quantity"]))
-                                )))
-                            ),
-                            (
-                                cond(ActionCondition.RESOURCE_FROM_GATHERING, resource=material["code"]),
-                                self.plan(ActionIntent(
-                                    Intention.GATHER_RESOURCES,
-                                    resource=material["code"],
-                                    condition=NOT(cond__item_qty_in_inv_and_bank(material["code"], material["quantity"]))
-                                ))
-                            ),
-                            # (
-                            #     cond(ActionCondition.RESOURCE_FROM_TASKS, resource=material["code"]),
-                            #     self.plan(ActionIntent(
-                            #         Intention.COMPLETE_TASKS,
-                            #         resource=material["code"],
-                            #         condition=NOT(cond__item_qty_in_inv_and_bank(material["code"], material["quantity"]))
-                            #     ))
-                            # ),
-                            fail_path=fail_action()
+            return WHILE(
+                group(
+                    IF(
+                        (
+                            NOT(cond__items_in_inv_and_bank(req_mats)),
+                            insufficient_mats_action
+                        ),
+                        (
+                            NOT(cond__items_in_inv(req_mats)),
+                            # Only build the withdrawal when the materials actually need fetching
+                            DeferredAction(plan_fetch_mats)
                         )
-                        for material in augment_req_mats(agent.get_inventory_size())
-                    ]))
-                else:
-                    insufficient_mats_action = fail_action()
-                
-                return group(
-                    reset_context_counter(name=context_counter),
-                    DeferredAction(lambda agent:
-                        WHILE(
-                            group(
-                                IF(
-                                    (
-                                        NOT(cond__items_in_inv_and_bank(augment_req_mats(agent.get_inventory_size()))),
-                                        insufficient_mats_action
-                                    ),
-                                    (
-                                        NOT(cond__items_in_inv(augment_req_mats(agent.get_inventory_size()))),
-                                        group(
-                                            add_item_reservations(name=agent.name, items=augment_req_mats(agent.get_inventory_size())),
-                                            IF(
-                                                (
-                                                    NOT(cond__inv_has_space_for_items(augment_req_mats(agent.get_inventory_size()))),
-                                                    self.plan(ActionIntent(Intention.DEPOSIT_ALL_AT_BANK))
-                                                )
-                                            ),
-                                            TRY(
-                                                self.plan(ActionIntent(Intention.WITHDRAW_ITEMS, items=augment_req_mats(agent.get_inventory_size()))),
-                                                finally_path=clear_item_reservations(
-                                                    name=agent.name, 
-                                                    items=[i["code"] for i in augment_req_mats(agent.get_inventory_size())]
-                                                )
-                                            )
-                                        )
-                                    )
-                                ),
-                                TRY(
-                                    self.plan(ActionIntent(Intention.CRAFT, item=craft_item, quantity=craft_qty if not craft_max else agent.get_inventory_size() // total_materials)),
-                                    success_path=DeferredAction(lambda agent: increment_context_counter(name=context_counter, value=agent.context["last_craft"]["quantity"])),
-                                    error_path=group(
-                                        clear_context_counter(name=context_counter),
-                                        fail_action()
-                                    )
-                                )
-                            ),
-                            condition=NOT(cond(
-                                ActionCondition.CONTEXT_COUNTER_AT_VALUE, 
-                                name=context_counter, 
-                                value=craft_qty if not craft_max else agent.get_inventory_size() // total_materials
-                            ))
+                    ),
+                    TRY(
+                        self._plan_craft(item=item, quantity=target_quantity),
+                        success_path=DeferredAction(lambda agent: increment_context_counter(name=context_counter, value=agent.last_craft_quantity)),
+                        error_path=group(
+                            clear_context_counter(name=context_counter),
+                            fail_action()
                         )
                     )
-                )
-            
-            case _:
-                raise Exception("Unknown action type.")
+                ),
+                condition=NOT(cond(
+                    ActionCondition.CONTEXT_COUNTER_AT_VALUE, 
+                    name=context_counter, 
+                    value=target_quantity
+                ))
+            )
+
+        collect_then_craft_action = group(
+            reset_context_counter(name=context_counter),
+            DeferredAction(plan_craft_loop)
+        )
+
+        self._cache_plan(self._collect_then_craft_cache, cache_key, collect_then_craft_action)
+        return collect_then_craft_action
+
+    def _plan_collect_material(self, material: str, quantity: int) -> ActionExecutable:
+        return IF(
+            (
+                cond(ActionCondition.RESOURCE_FROM_FIGHTING, resource=material),
+                DeferredAction(lambda agent: self._plan_fight_monsters(
+                    monster=agent.world_state._drop_sources[material][0],
+                    condition=NOT(cond__item_qty_in_inv_and_bank(material, quantity))
+                ))
+            ),
+            (
+                cond(ActionCondition.RESOURCE_FROM_GATHERING, resource=material),
+                DeferredAction(lambda agent: self._plan_gather_resources(
+                    resource=material,
+                    condition=NOT(cond__item_qty_in_inv_and_bank(material, quantity))
+                ))
+            ),
+            # (
+            #     cond(ActionCondition.RESOURCE_FROM_TASKS, resource=material),
+            #     self.plan(ActionIntent(
+            #         Intention.COMPLETE_TASKS,
+            #         resource=material,
+            #         condition=NOT(cond__item_qty_in_inv_and_bank(material, quantity))
+            #     ))
+            # ),
+            fail_path=fail_action()
+        )
@@ -104,6 +104,14 @@ class ActionScheduler:
         elif isinstance(node, DeferredAction):
             deferred_node = node.resolver(agent)
             success = await self._process_node(agent, deferred_node)
+        elif isinstance(node, ContextBoundAction):
+            # Nothing to bind means an earlier step never ran, so the node can't be performed
+            if node.context_key not in agent.context:
+                self.logger.error(f"[{agent.name}] No '{node.context_key}' in context to bind to '{node.param}'.")
+                return False
+
+            bound_node = node.factory(**{node.param: agent.context[node.context_key]}, **node.params)
+            success = await self._process_node(agent, bound_node)
         else:
             raise Exception("Unrecognised node typing.")
 
@@ -220,7 +228,7 @@ class ActionScheduler:
                 result = True
 
                 # Check the repeat condition first, since it's a prerequisite for performing the child nodes
-                while self._evaluate_condition(agent, control_node.condition):
+                while control_node.condition is None or self._evaluate_condition(agent, control_node.condition):
                     result = await self._process_node(agent, control_node.node)
 
                     # Break out if the sub node has failed
@@ -237,8 +245,8 @@ class ActionScheduler:
                     if not result:
                         return result
                     
-                    # Check the repeat condition last to see if we should repeat
-                    if not self._evaluate_condition(agent, control_node.condition):
+                    # Check the repeat condition last to see if we should repeat, loops without one repeat forever
+                    if control_node.condition is not None and not self._evaluate_condition(agent, control_node.condition):
                         break
                 
                 return result
@@ -261,9 +269,9 @@ class ActionScheduler:
                 return result
 
     def _evaluate_control_branches(self, agent: CharacterAgent, control_node: ActionControlNode) -> Action | ActionGroup | ActionControlNode | None:
-        for branch in control_node.branches:
-            if self._evaluate_condition(agent, branch[0]):
-                return branch[1]
+        for condition, branch in control_node.branches:
+            if self._evaluate_condition(agent, condition):
+                return branch
             
         return control_node.fail_path
 
@@ -4,7 +4,7 @@ import logging
 import uuid
 import re
 from dataclasses import dataclass
-from typing import Dict, List, Set, Tuple, Any
+from typing import Callable, Dict, List, Set, Tuple, Any
 from math import floor, ceil
 from itertools import product
 from datetime import datetime
@@ -14,6 +14,12 @@ from src.helpers import *
 type LocationSet = Set[Tuple[int, int]]
 type DataMapping = Dict[str, Set[str]]
 
+# Task master content codes on the map, by the type of task they hand out
+TASK_MASTER_TYPES = {
+    "monsters": TaskType.FIGHTING,
+    "items": TaskType.ITEMS
+}
+
 @dataclass
 class WorldInteractions:
     resources: Dict[str, LocationSet]
@@ -21,7 +27,7 @@ class WorldInteractions:
     workshops: Dict[str, LocationSet]
     banks: Dict[str, LocationSet]
     grand_exchanges: Dict[str, LocationSet]
-    tasks_masters: Dict[str, LocationSet]
+    tasks_masters: Dict[TaskType, LocationSet]
     npcs: Dict[str, LocationSet]
 
 class WorldState:
@@ -39,9 +45,13 @@ class WorldState:
         self._tile_to_resource = {}
         self._drop_sources = {}
         self._item_stat_vectors = {}
+        self._workshops_for_item: Dict[str, Tuple[Tuple[int, int], ...]] = {}
 
         self.bank_reservations = {}
 
+        # Called whenever the world data changes, for anything caching lookups derived from it
+        self._invalidation_listeners: List[Callable[[], None]] = []
+
         self.__post_init__()
 
     def __post_init__(self):
@@ -49,6 +59,18 @@ class WorldState:
         self._resource_to_tile, self._tile_to_resource = self._generate_resource_sources()
         self._drop_sources = self._generate_monster_drop_sources()
         self._item_stat_vectors = self._generate_item_stat_vectors()
+        self._workshops_for_item = self._generate_item_workshop_locations()
+
+    ## Invalidation
+    def subscribe(self, listener: Callable[[], None]):
+        self._invalidation_listeners.append(listener)
+
+    def invalidate(self):
+        """Regenerate lookups derived from the world data and notify subscribers."""
+        self.__post_init__()
+
+        for listener in self._invalidation_listeners:
+            listener()
 
     ## Post-Init Generation
     def _generate_interactions(self) -> WorldInteractions:
@@ -69,10 +91,16 @@ class WorldState:
             interactions["workshop"],
             interactions["bank"]["bank"],
             interactions["grand_exchange"],
-            interactions["tasks_master"],
+            self._generate_task_master_locations(interactions["tasks_master"]),
             interactions["npc"]
         )
 
+    def _generate_task_master_locations(self, task_masters: Dict[str, LocationSet]) -> Dict[TaskType, LocationSet]:
+        for code in task_masters.keys() - TASK_MASTER_TYPES.keys():
+            self.logger.warning(f"Ignoring task master with unknown task type '{code}'.")
+
+        return {TASK_MASTER_TYPES[code]: locations for code, locations in task_masters.items() if code in TASK_MASTER_TYPES}
+
     def _generate_resource_sources(self) -> Tuple[DataMapping, DataMapping]:
         resource_to_tile = {}
         tile_to_resource = {}
@@ -117,6 +145,20 @@ class WorldState:
 
         return item_stat_vectors
     
+    def _generate_item_workshop_locations(self) -> Dict[str, Tuple[Tuple[int, int], ...]]:
+        workshops_for_item = {}
+
+        for item, data in self._item_data.items():
+            craft_data = data.get("craft")
+            if not craft_data:
+                continue
+
+            skill = craft_data["skill"]
+            if skill in self._interactions.workshops:
+                workshops_for_item[item] = tuple(self._interactions.workshops[skill])
+
+        return workshops_for_item
+    
     # Item Checkers
     def is_an_item(self, item: str) -> bool:
         return item in self._item_data
@@ -158,6 +200,12 @@ class WorldState:
         
         raise KeyError(f"{skill} is not a skill.")
     
+    def get_workshop_locations_for_item(self, item: str) -> Tuple[Tuple[int, int], ...]:
+        if item not in self._workshops_for_item:
+            raise KeyError(f"{item} has no workshop to craft it at.")
+        
+        return self._workshops_for_item[item]
+    
     def character_meets_conditions_for_item(self, character: dict, conditions: list) -> bool:
         for condition in conditions:
             match condition["code"]:
@@ -205,7 +253,7 @@ class WorldState:
     def is_armour(self, item: str) -> bool:
         return self.is_an_item(item) and self._item_data[item]["type"] in ARMOUR_SLOTS
     
-    def prepare_best_loadout_for_task(self, character: Dict[str, Any], task: str, target: str) -> Tuple[Dict[str, int], List[Dict[str, str]]]:
+    def prepare_best_loadout_for_task(self, character: Dict[str, Any], task: TaskType, target: str) -> Tuple[Dict[str, int], List[Dict[str, str]]]:
         loadout = self.get_best_loadout_for_task(character, task, target)
 
         final_loadout = []
@@ -214,7 +262,7 @@ class WorldState:
         for item in loadout:
             # If the item is already equipped, skip.
             # Only actual equipment slots are called *_slot, so the broad check is ok.
-            if any([equipped == item for slot, equipped in character.items() if re.search(r'_slot$', slot)]):
+            if any(equipped == item for slot, equipped in character.items() if re.search(r'_slot$', slot)):
                 continue
 
             final_loadout.append({ "code": item, "quantity": 1 })
@@ -224,16 +272,16 @@ class WorldState:
             equip_queue.append({ "code": item, "slot": item_slot })
 
         # For fighting tasks, also withdraw some food
-        if task == "fighting":
+        if task == TaskType.FIGHTING:
             best_food = self.get_best_food_for_character_in_bank(character)
             if best_food:
                 food_amount = self.get_amount_of_item_in_bank(best_food)
-                final_loadout.extend({ "code": best_food, "quantity": min(50, food_amount) })
+                final_loadout.append({ "code": best_food, "quantity": min(50, food_amount) })
 
         return final_loadout, equip_queue
     
-    def get_best_loadout_for_task(self, character: dict, task: str, target: str) -> List[str]:
-        if task == "fighting":
+    def get_best_loadout_for_task(self, character: dict, task: TaskType, target: str) -> List[str]:
+        if task == TaskType.FIGHTING:
             relevant_weapon_stats = ["attack_air", "attack_water", "attack_earth", "attack_fire", "critical_strike"]
             relevant_armour_stats = [
                 "hp", "res_air", "res_water", "res_earth", "res_fire",
@@ -241,7 +289,7 @@ class WorldState:
                 "initiative", "haste", "wisdom", "prospecting"
             ]
             evaluation_function = self._evaluate_loadout_for_fighting
-        elif task == "gathering":
+        elif task == TaskType.GATHERING:
             skill = self.get_gather_skill_for_resource(target)
             relevant_weapon_stats = [skill]
             relevant_armour_stats = ["wisdom", "prospecting"]
@@ -572,7 +620,7 @@ class WorldState:
         return amount_reserved
     
     # Other Checkers
-    def get_task_master_locations(self) -> LocationSet:
+    def get_task_master_locations(self) -> Dict[TaskType, LocationSet]:
         return self._interactions.tasks_masters
 
    ## Action Performance
@@ -1,6 +1,9 @@
+import asyncio
 import pytest
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 
+from src.action import Action, ActionOutcome, CharacterAction
+from src.api import APIResult, RequestOutcome, RequestOutcomeDetail
 from src.character import CharacterAgent
 from src.helpers import ItemOrder, ItemSelection, ItemQuantity
 
@@ -615,4 +618,21 @@ def test__items_in_equip_queue(agent: CharacterAgent, context, expected):
     agent.context = context
     result = agent.items_in_equip_queue()
     assert result == expected
-    
\ No newline at end of file
+
+## Actions
+#perform
+@pytest.mark.parametrize(
+    "action,api_method,data,attribute,expected",
+    [
+        pytest.param(Action(CharacterAction.CRAFT, params={"item": "copper_bar", "quantity": 3}), "craft", {"details": {"items": [{"code": "copper_bar", "quantity": 3}]}}, "last_craft_quantity", 3, id="craft"),
+        pytest.param(Action(CharacterAction.TASK_TRADE, params={"item": "copper_ore", "quantity": 7}), "task_trade", {"trade": {"code": "copper_ore", "quantity": 7}}, "last_trade_quantity", 7, id="task_trade"),
+    ]
+)
+
+def test__perform_records_result_quantities(agent: CharacterAgent, action, api_method, data, attribute, expected):
+    response = {"data": {**data, "cooldown": {"remaining_seconds": 0}}}
+    setattr(agent.api_client, api_method, AsyncMock(return_value=APIResult(response, RequestOutcome.SUCCESS, RequestOutcomeDetail.OK)))
+
+    result = asyncio.run(agent.perform(action))
+    assert result == ActionOutcome.SUCCESS
+    assert getattr(agent, attribute) == expected
@@ -0,0 +1,408 @@
+import pytest
+from unittest.mock import MagicMock
+
+from src.action import *
+from src.condition_factories import cond
+from src.planner import ActionPlanner, ActionIntent, Intention
+from src.helpers import ItemOrder, ItemSelection, ItemQuantity, TaskType
+
+@pytest.fixture
+def planner() -> ActionPlanner:
+    world_state = MagicMock()
+    world_state.get_crafting_materials_for_item.return_value = [
+        {"code": "copper_ore", "quantity": 10}
+    ]
+    world_state.get_task_master_locations.return_value = {
+        TaskType.FIGHTING: {(1, 2)},
+        TaskType.ITEMS: {(4, 13)}
+    }
+
+    return ActionPlanner(world_state)
+
+## Intents
+def test__intent_params(planner: ActionPlanner):
+    intent = ActionIntent(Intention.COLLECT_THEN_CRAFT, item="copper_bar", quantity=5)
+
+    assert (intent.item, intent.quantity, intent.craft_max) == ("copper_bar", 5, False)
+    assert hash(intent) == hash(ActionIntent(Intention.COLLECT_THEN_CRAFT, item="copper_bar", quantity=5))
+
+    with pytest.raises(TypeError):
+        ActionIntent(Intention.MOVE, unknown=True)
+
+## Conditions
+@pytest.mark.parametrize(
+    "value,other",
+    [
+        pytest.param(1, True, id="int_and_bool"),
+        pytest.param(0, False, id="zero_and_false"),
+        pytest.param(1, 1.0, id="int_and_float"),
+    ]
+)
+
+def test__interned_conditions_keep_parameter_types(value, other):
+    first = cond(ActionCondition.INVENTORY_HAS_ITEM_OF_QUANTITY, v=value)
+    second = cond(ActionCondition.INVENTORY_HAS_ITEM_OF_QUANTITY, v=other)
+
+    assert first is not second
+    assert type(second.parameters["v"]) is type(other)
+    assert cond(ActionCondition.INVENTORY_HAS_ITEM_OF_QUANTITY, v=value) is first
+
+## Dispatch
+@pytest.mark.parametrize(
+    "intent",
+    [
+        pytest.param(ActionIntent(Intention.MOVE, x=1, y=2), id="move"),
+        pytest.param(ActionIntent(Intention.FIGHT), id="fight"),
+        pytest.param(ActionIntent(Intention.REST), id="rest"),
+        pytest.param(ActionIntent(Intention.GATHER), id="gather"),
+        pytest.param(ActionIntent(Intention.CRAFT, item="copper_bar", quantity=1), id="craft"),
+        pytest.param(ActionIntent(Intention.EQUIP), id="equip"),
+        pytest.param(ActionIntent(Intention.UNEQUIP), id="unequip"),
+        pytest.param(ActionIntent(Intention.WITHDRAW_ITEMS, items=[]), id="withdraw_items"),
+        pytest.param(ActionIntent(Intention.DEPOSIT_ITEMS, preset="all"), id="deposit_items_all"),
+        pytest.param(ActionIntent(Intention.DEPOSIT_ITEMS, items=[]), id="deposit_items"),
+        pytest.param(ActionIntent(Intention.DEPOSIT_ALL_AT_BANK), id="deposit_all_at_bank"),
+        pytest.param(ActionIntent(Intention.WITHDRAW_GOLD, quantity=10), id="withdraw_gold"),
+        pytest.param(ActionIntent(Intention.DEPOSIT_GOLD, quantity=10), id="deposit_gold"),
+        pytest.param(ActionIntent(Intention.PREPARE_FOR_TASK, task_type=TaskType.FIGHTING, target="chicken"), id="prepare_for_task"),
+        pytest.param(ActionIntent(Intention.FIGHT_MONSTERS, monster="chicken", condition=cond(ActionCondition.FOREVER)), id="fight_monsters"),
+        pytest.param(ActionIntent(Intention.GATHER_RESOURCES, resource="copper_ore", condition=cond(ActionCondition.FOREVER)), id="gather_resources"),
+        pytest.param(ActionIntent(Intention.MOVE_TO_TASK_MASTER, task_type=TaskType.ITEMS), id="move_to_task_master"),
+        pytest.param(ActionIntent(Intention.COMPLETE_TASKS, task_type=TaskType.ITEMS), id="complete_tasks"),
+        pytest.param(ActionIntent(Intention.PLAN_TASK_COMPLETION), id="plan_task_completion"),
+        pytest.param(ActionIntent(Intention.COMPLETE_MONSTER_TASK), id="complete_monster_task"),
+        pytest.param(ActionIntent(Intention.COMPLETE_ITEM_TASK_GATHERING), id="complete_item_task_gathering"),
+        pytest.param(ActionIntent(Intention.COMPLETE_ITEM_TASK_CRAFTING), id="complete_item_task_crafting"),
+        pytest.param(ActionIntent(Intention.TURN_IN_ITEM_TASK_ITEMS), id="turn_in_item_task_items"),
+        pytest.param(ActionIntent(Intention.BANK_THEN_RETURN, preset="all"), id="bank_then_return"),
+        pytest.param(ActionIntent(Intention.COLLECT_THEN_CRAFT, item="copper_bar"), id="collect_then_craft"),
+        pytest.param(ActionIntent(Intention.CRAFT_OR_GATHER_INTERMEDIARIES, item="copper_bar"), id="craft_or_gather_intermediaries"),
+    ]
+)
+
+def test__plan(planner: ActionPlanner, intent):
+    result = planner.plan(intent)
+    assert isinstance(result, (Action, ActionGroup, ActionControlNode, DeferredAction))
+
+@pytest.mark.parametrize(
+    "intention,exception",
+    [
+        pytest.param(Intention.TRANSITION, NotImplementedError, id="not_implemented"),
+        pytest.param(Intention.CRAFT_UNTIL_LEVEL, Exception, id="unknown_intention"),
+    ]
+)
+
+def test__plan_unhandled(planner: ActionPlanner, intention, exception):
+    with pytest.raises(exception):
+        planner.plan(ActionIntent(intention))
+
+@pytest.mark.parametrize(
+    "intention",
+    [
+        pytest.param(Intention.FIGHT, id="fight"),
+        pytest.param(Intention.REST, id="rest"),
+        pytest.param(Intention.GATHER, id="gather"),
+        pytest.param(Intention.EQUIP, id="equip"),
+        pytest.param(Intention.UNEQUIP, id="unequip"),
+        pytest.param(Intention.DEPOSIT_ALL_AT_BANK, id="deposit_all_at_bank"),
+        pytest.param(Intention.PLAN_TASK_COMPLETION, id="plan_task_completion"),
+    ]
+)
+
+def test__parameterless_plans_are_reused(planner: ActionPlanner, intention):
+    assert planner.plan(ActionIntent(intention)) is planner.plan(ActionIntent(intention))
+
+@pytest.mark.parametrize(
+    "intent,cached",
+    [
+        pytest.param(ActionIntent(Intention.MOVE, x=1, y=2), True, id="hashable_params"),
+        pytest.param(ActionIntent(Intention.MOVE_TO_TASK_MASTER, task_type=TaskType.ITEMS), True, id="enum_params"),
+        pytest.param(ActionIntent(Intention.WITHDRAW_ITEMS, items=ItemOrder(items=[ItemSelection(item="copper_ore", quantity=ItemQuantity(max=10))])), True, id="item_order_params"),
+        pytest.param(ActionIntent(Intention.WITHDRAW_ITEMS, items=[]), False, id="unhashable_params"),
+        pytest.param(ActionIntent(Intention.FIGHT_MONSTERS, monster="chicken", condition=cond(ActionCondition.FOREVER)), False, id="condition_params"),
+    ]
+)
+
+def test__plans_are_cached(planner: ActionPlanner, intent, cached):
+    planner.plan(intent)
+    assert (len(planner._plan_cache) == 1) == cached
+
+def test__plan_cache_is_bounded(planner: ActionPlanner):
+    planner.MAX_CACHED_PLANS = 2
+    planner.plan(ActionIntent(Intention.MOVE, x=1, y=1))
+    planner.plan(ActionIntent(Intention.MOVE, x=2, y=2))
+    planner.plan(ActionIntent(Intention.MOVE, x=3, y=3))
+
+    assert len(planner._plan_cache) == 2
+    assert planner._plan_cache_key(ActionIntent(Intention.MOVE, x=1, y=1)) not in planner._plan_cache
+
+def test__plan_cache_keeps_parameter_types_apart(planner: ActionPlanner):
+    planner.plan(ActionIntent(Intention.WITHDRAW_GOLD, quantity=1))
+    planner.plan(ActionIntent(Intention.WITHDRAW_GOLD, quantity=True))
+
+    assert len(planner._plan_cache) == 2
+
+def test__identical_subtrees_are_shared(planner: ActionPlanner):
+    withdraw = planner.plan(ActionIntent(Intention.WITHDRAW_GOLD, quantity=10))
+    deposit = planner.plan(ActionIntent(Intention.DEPOSIT_GOLD, quantity=10))
+
+    assert withdraw.actions[0] is deposit.actions[0]
+    assert withdraw.actions[1] is not deposit.actions[1]
+
+def test__interned_groups_hold_tuples(planner: ActionPlanner):
+    result = planner.plan(ActionIntent(Intention.WITHDRAW_GOLD, quantity=10))
+
+    assert isinstance(result.actions, tuple)
+    assert ActionGroup(actions=list(result.actions)) == result
+
+@pytest.mark.parametrize(
+    "intent",
+    [
+        pytest.param(ActionIntent(Intention.WITHDRAW_ITEMS, items=ItemOrder(items=[ItemSelection(item="copper_ore", quantity=ItemQuantity(max=10))])), id="withdraw_items"),
+        pytest.param(ActionIntent(Intention.DEPOSIT_ITEMS, preset="all"), id="deposit_all"),
+        pytest.param(ActionIntent(Intention.WITHDRAW_GOLD, quantity=10), id="withdraw_gold"),
+        pytest.param(ActionIntent(Intention.BANK_THEN_RETURN, preset="all"), id="bank_then_return"),
+    ]
+)
+
+def test__bank_plans_reuse_move_to_bank(planner: ActionPlanner, intent):
+    assert planner.plan(intent).actions[0] is planner._move_to_bank
+
+def test__deposit_all_items_uses_static_plan(planner: ActionPlanner):
+    result = planner.plan(ActionIntent(Intention.DEPOSIT_ITEMS, preset="all"))
+
+    assert result is planner.plan(ActionIntent(Intention.DEPOSIT_ALL_AT_BANK))
+
+## Basic Intentions
+#MOVE
+@pytest.mark.parametrize(
+    "intent,expected",
+    [
+        pytest.param(ActionIntent(Intention.MOVE, x=1, y=2), {"x": 1, "y": 2}, id="coordinates"),
+        pytest.param(ActionIntent(Intention.MOVE, previous=True), {"previous": True}, id="previous"),
+    ]
+)
+
+def test__move(planner: ActionPlanner, intent, expected):
+    assert planner.plan(intent).params == expected
+
+#CRAFT
+@pytest.mark.parametrize(
+    "intent,inventory,expected",
+    [
+        pytest.param(ActionIntent(Intention.CRAFT, item="copper_bar", quantity=3), 25, 3, id="quantity"),
+        pytest.param(ActionIntent(Intention.CRAFT, item="copper_bar", as_many_as_possible=True), 25, 2, id="as_many_as_possible"),
+        pytest.param(ActionIntent(Intention.CRAFT, item="copper_bar", as_many_as_possible=True), 5, 0, id="as_many_as_possible__no_materials"),
+    ]
+)
+
+def test__craft(planner: ActionPlanner, intent, inventory, expected):
+    agent = MagicMock()
+    agent.get_quantity_of_item_in_inventory.side_effect = lambda code: inventory if code == "copper_ore" else 0
+
+    craft_action = planner.plan(intent).actions[1]
+    if isinstance(craft_action, DeferredAction):
+        craft_action = craft_action.resolver(agent)
+
+    assert craft_action.params == {"item": "copper_bar", "quantity": expected}
+
+## General Worker Intentions
+#PREPARE_FOR_TASK
+@pytest.mark.parametrize(
+    "task_type,target,locator,exception",
+    [
+        pytest.param(TaskType.FIGHTING, "chicken", "get_locations_of_monster", None, id="fighting"),
+        pytest.param(TaskType.GATHERING, "copper_ore", "get_locations_of_resource", None, id="gathering"),
+        pytest.param(TaskType.CRAFTING, "copper_bar", None, Exception, id="unknown_task_type"),
+    ]
+)
+
+def test__prepare_for_task(planner: ActionPlanner, task_type, target, locator, exception):
+    intent = ActionIntent(Intention.PREPARE_FOR_TASK, task_type=task_type, target=target)
+    if exception:
+        with pytest.raises(exception):
+            planner.plan(intent)
+    else:
+        planner.plan(intent)
+        getattr(planner.world_state, locator).assert_called_once_with(target)
+
+def test__prepare_for_task_shares_loadout_steps(planner: ActionPlanner):
+    chicken = planner.plan(ActionIntent(Intention.PREPARE_FOR_TASK, task_type=TaskType.FIGHTING, target="chicken"))
+    cow = planner.plan(ActionIntent(Intention.PREPARE_FOR_TASK, task_type=TaskType.FIGHTING, target="cow"))
+    chicken_try, cow_try = chicken.actions[-1], cow.actions[-1]
+
+    assert chicken.actions[2] is cow.actions[2]
+    assert chicken_try.finally_path is cow_try.finally_path
+    assert chicken_try.node.actions[:2] == cow_try.node.actions[:2]
+
+#FIGHT_MONSTERS
+def test__fight_monsters_shares_prepare_action(planner: ActionPlanner):
+    result = planner.plan(ActionIntent(Intention.FIGHT_MONSTERS, monster="chicken", condition=cond(ActionCondition.FOREVER)))
+    prepare_action, loop = result.actions
+    _, refill_action = loop.node.actions[0].branches[0]
+
+    assert refill_action is prepare_action
+
+def test__fight_monsters_shares_refill_condition(planner: ActionPlanner):
+    chicken = planner.plan(ActionIntent(Intention.FIGHT_MONSTERS, monster="chicken", condition=cond(ActionCondition.FOREVER)))
+    cow = planner.plan(ActionIntent(Intention.FIGHT_MONSTERS, monster="cow", condition=cond(ActionCondition.FOREVER)))
+
+    chicken_refill, _ = chicken.actions[1].node.actions[0].branches[0]
+    cow_refill, _ = cow.actions[1].node.actions[0].branches[0]
+    assert chicken_refill is cow_refill
+
+def test__planner_subscribes_to_world_invalidation(planner: ActionPlanner):
+    planner.world_state.subscribe.assert_called_once_with(planner.invalidate)
+
+def test__world_lookups_are_memoized(planner: ActionPlanner):
+    intent = ActionIntent(Intention.FIGHT_MONSTERS, monster="chicken", condition=cond(ActionCondition.FOREVER))
+    planner.plan(intent)
+    planner.plan(intent)
+    planner.world_state.get_locations_of_monster.assert_called_once_with("chicken")
+
+    planner.invalidate()
+    planner.plan(intent)
+    assert planner.world_state.get_locations_of_monster.call_count == 2
+
+## Task Execution
+#MOVE_TO_TASK_MASTER
+@pytest.mark.parametrize(
+    "task_type,exception",
+    [
+        pytest.param(TaskType.FIGHTING, None, id="fighting"),
+        pytest.param(TaskType.ITEMS, None, id="items"),
+        pytest.param(TaskType.CRAFTING, KeyError, id="no_task_master"),
+    ]
+)
+
+def test__move_to_task_master(planner: ActionPlanner, task_type, exception):
+    intent = ActionIntent(Intention.MOVE_TO_TASK_MASTER, task_type=task_type)
+    if exception:
+        with pytest.raises(exception):
+            planner.plan(intent)
+    else:
+        assert planner.plan(intent) is planner._task_master_moves[task_type]
+
+#COMPLETE_TASKS
+def test__complete_tasks_loops_without_condition(planner: ActionPlanner):
+    result = planner.plan(ActionIntent(Intention.COMPLETE_TASKS, task_type=TaskType.FIGHTING))
+
+    assert result.control_operator == ControlOperator.DO_WHILE
+    assert result.condition is None
+
+def test__planner_without_items_task_master():
+    world_state = MagicMock()
+    world_state.get_task_master_locations.return_value = {TaskType.FIGHTING: {(1, 2)}}
+    planner = ActionPlanner(world_state)
+
+    assert Intention.PLAN_TASK_COMPLETION not in planner._static_plans
+    planner.plan(ActionIntent(Intention.COMPLETE_TASKS, task_type=TaskType.FIGHTING))
+
+    with pytest.raises(KeyError):
+        planner.plan(ActionIntent(Intention.MOVE_TO_TASK_MASTER, task_type=TaskType.ITEMS))
+
+#COMPLETE_MONSTER_TASK
+def test__monster_task_plan_reused_per_target(planner: ActionPlanner):
+    deferred = planner.plan(ActionIntent(Intention.COMPLETE_MONSTER_TASK))
+    agent = MagicMock()
+
+    agent.get_task_target.return_value = "chicken"
+    first = deferred.resolver(agent)
+    assert deferred.resolver(agent) is first
+
+    agent.get_task_target.return_value = "cow"
+    second = deferred.resolver(agent)
+    assert second is not first
+    assert second.actions[1].condition is first.actions[1].condition
+
+## Complex Intentions
+#COLLECT_THEN_CRAFT
+def test__collect_then_craft_is_cached(planner: ActionPlanner):
+    first = planner.plan(ActionIntent(Intention.COLLECT_THEN_CRAFT, item="copper_bar", quantity=5))
+    second = planner.plan(ActionIntent(Intention.COLLECT_THEN_CRAFT, item="copper_bar", quantity=5))
+
+    assert first is second
+    planner.world_state.get_crafting_materials_for_item.assert_called_once_with("copper_bar")
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        pytest.param({"item": "copper_bar", "quantity": 6}, id="different_quantity"),
+        pytest.param({"item": "copper_bar", "quantity": 5.0}, id="different_quantity_type"),
+        pytest.param({"item": "copper_bar", "quantity": 5, "craft_max": True}, id="craft_max"),
+        pytest.param({"item": "copper_bar", "quantity": 5, "gather_intermediaries": True}, id="gather_intermediaries"),
+        pytest.param({"item": "iron_bar", "quantity": 5}, id="different_item"),
+    ]
+)
+
+def test__collect_then_craft_cache_keyed_on_params(planner: ActionPlanner, params):
+    first = planner.plan(ActionIntent(Intention.COLLECT_THEN_CRAFT, item="copper_bar", quantity=5))
+    second = planner.plan(ActionIntent(Intention.COLLECT_THEN_CRAFT, **params))
+
+    assert first is not second
+
+def test__collect_then_craft_recipe_loaded_once(planner: ActionPlanner):
+    planner.plan(ActionIntent(Intention.COLLECT_THEN_CRAFT, item="copper_bar", quantity=5))
+    planner.plan(ActionIntent(Intention.CRAFT_OR_GATHER_INTERMEDIARIES, item="copper_bar", quantity=10))
+
+    planner.world_state.get_crafting_materials_for_item.assert_called_once_with("copper_bar")
+
+@pytest.mark.parametrize(
+    "craft_max,craft_type",
+    [
+        pytest.param(False, Action, id="quantity"),
+        pytest.param(True, DeferredAction, id="craft_max"),
+    ]
+)
+
+def test__collect_then_craft_without_materials(planner: ActionPlanner, craft_max, craft_type):
+    planner.world_state.get_crafting_materials_for_item.return_value = []
+    result = planner.plan(ActionIntent(Intention.COLLECT_THEN_CRAFT, item="copper_bar", quantity=5, craft_max=craft_max))
+
+    assert result.actions[0] == planner._plan_craft(item="copper_bar", quantity=5).actions[0]
+    assert type(result.actions[1]) is craft_type
+
+def test__collect_then_craft_scales_recipe_once(planner: ActionPlanner):
+    result = planner.plan(ActionIntent(Intention.COLLECT_THEN_CRAFT, item="copper_bar", quantity=5))
+    agent = MagicMock()
+    agent.get_inventory_size.return_value = 100
+
+    loop = result.actions[1].resolver(agent)
+
+    agent.get_inventory_size.assert_called_once_with()
+    assert loop.condition.children[0].parameters["value"] == 5
+
+def test__collect_then_craft_defers_withdrawal(planner: ActionPlanner):
+    result = planner.plan(ActionIntent(Intention.COLLECT_THEN_CRAFT, item="copper_bar", quantity=5))
+    agent = MagicMock()
+    agent.get_inventory_size.return_value = 100
+
+    loop = result.actions[1].resolver(agent)
+    _, withdraw_branch = loop.node.actions[0].branches[1]
+
+    assert isinstance(withdraw_branch, DeferredAction)
+
+    _, fetch = withdraw_branch.resolver(agent).actions
+    (_, bank_session), = fetch.node.branches
+    assert bank_session.actions[-1] is fetch.node.fail_path.actions[-1]
+    assert bank_session.actions[0] is planner._move_to_bank
+    assert bank_session.actions[1].params == {"deposit_all": True, "exclude": ()}
+
+def test__craft_or_gather_collects_scaled_materials(planner: ActionPlanner):
+    result = planner.plan(ActionIntent(Intention.CRAFT_OR_GATHER_INTERMEDIARIES, item="copper_bar", quantity=5))
+    agent = MagicMock()
+    agent.get_inventory_size.return_value = 100
+
+    loop = result.actions[1].resolver(agent)
+    _, gather_branch = loop.node.actions[0].branches[0]
+    (collect_material,) = gather_branch.resolver(agent).actions
+    (_, fight_for_material), (_, gather_material) = collect_material.resolver(agent).branches
+
+    # Neither way of collecting the material is built until the agent reaches it
+    assert isinstance(fight_for_material, DeferredAction)
+    assert isinstance(gather_material, DeferredAction)
+    planner.world_state.get_locations_of_resource.assert_not_called()
+
+    _, gather_loop = gather_material.resolver(agent).actions
+    planner.world_state.get_locations_of_resource.assert_called_once_with("copper_ore")
+    assert gather_loop.condition.children[0].parameters == {"item": "copper_ore", "quantity": 50}
@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from src.action import ContextBoundAction
+from src.action_factories import bank_withdraw_item, rest
+from src.control_factories import WHILE, DO_WHILE
+from src.scheduler import ActionScheduler
+
+@pytest.fixture
+def scheduler() -> ActionScheduler:
+    scheduler = ActionScheduler(MagicMock())
+    scheduler._process_single_action = AsyncMock(return_value=True)
+
+    return scheduler
+
+@pytest.fixture
+def agent() -> MagicMock:
+    agent = MagicMock()
+    agent.name = "Test Agnt"
+    agent.abort_actions = False
+    agent.context = {}
+
+    return agent
+
+
+## Node Processing
+#ContextBoundAction
+def test__context_bound_action_binds_context_value(scheduler: ActionScheduler, agent):
+    loadout = [{"code": "copper_ore", "quantity": 5}]
+    agent.context["prepared_loadout"] = loadout
+    node = ContextBoundAction(bank_withdraw_item, "prepared_loadout", params={"preset": "loadout"})
+
+    assert asyncio.run(scheduler._process_node(agent, node))
+    scheduler._process_single_action.assert_awaited_once_with(agent, bank_withdraw_item(items=loadout, preset="loadout"))
+
+def test__context_bound_action_missing_context_key(scheduler: ActionScheduler, agent):
+    node = ContextBoundAction(bank_withdraw_item, "prepared_loadout")
+
+    assert not asyncio.run(scheduler._process_node(agent, node))
+    scheduler._process_single_action.assert_not_awaited()
+
+#WHILE / DO_WHILE
+@pytest.mark.parametrize("loop", [pytest.param(WHILE, id="while"), pytest.param(DO_WHILE, id="do_while")])
+
+def test__unconditional_loop_repeats_until_failure(scheduler: ActionScheduler, agent, loop):
+    scheduler._process_single_action.side_effect = [True, True, False]
+
+    assert not asyncio.run(scheduler._process_node(agent, loop(rest())))
+    assert scheduler._process_single_action.await_count == 3
+
+@pytest.mark.parametrize("loop", [pytest.param(WHILE, id="while"), pytest.param(DO_WHILE, id="do_while")])
+
+def test__unconditional_loop_repeats_until_aborted(scheduler: ActionScheduler, agent, loop):
+    async def abort_on_third_run(agent, action):
+        if scheduler._process_single_action.await_count == 3:
+            agent.abort_actions = True
+
+        return True
+
+    scheduler._process_single_action.side_effect = abort_on_third_run
+
+    assert not asyncio.run(scheduler._process_node(agent, loop(rest())))
+    assert scheduler._process_single_action.await_count == 3
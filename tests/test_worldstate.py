@@ -3,6 +3,7 @@ import json
 from unittest.mock import MagicMock
 
 from src.worldstate import WorldState
+from src.helpers import TaskType
 
 @pytest.fixture
 def world_state() -> WorldState:
@@ -23,6 +24,35 @@ def world_state() -> WorldState:
 
     return WorldState(bank_data, map_data, item_data, resource_data, monster_data)
 
+## Invalidation
+#invalidate
+def test__invalidate(world_state: WorldState):
+    listener = MagicMock()
+    world_state.subscribe(listener)
+    world_state.invalidate()
+
+    listener.assert_called_once()
+
+## Map Interactions
+#get_task_master_locations
+def map_tile(x: int, y: int, content_type: str, code: str) -> dict:
+    return { "x": x, "y": y, "interactions": { "content": { "type": content_type, "code": code } } }
+
+def test__get_task_master_locations__ignores_unknown_task_types():
+    map_data = [
+        map_tile(0, 0, "resource", "copper_rocks"),
+        map_tile(1, 0, "monster", "chicken"),
+        map_tile(2, 0, "workshop", "mining"),
+        map_tile(3, 0, "bank", "bank"),
+        map_tile(4, 0, "grand_exchange", "grand_exchange"),
+        map_tile(5, 0, "tasks_master", "monsters"),
+        map_tile(6, 0, "tasks_master", "events"),
+        map_tile(7, 0, "npc", "merchant"),
+    ]
+    world_state = WorldState([], map_data, [], [], [])
+
+    assert world_state.get_task_master_locations() == { TaskType.FIGHTING: {(5, 0)} }
+
 ## Item Checkers
 #is_an_item
 @pytest.mark.parametrize(
@@ -132,6 +162,26 @@ def test__get_workshop_locations(world_state: WorldState, skill, expected, excep
             world_state.get_workshop_locations(skill)
     else:
         assert world_state.get_workshop_locations(skill)
+
+#get_workshop_locations_for_item
+@pytest.mark.parametrize(
+    "item,exception",
+    [
+        pytest.param("copper_bar", None, id="is_craftable"),
+        pytest.param("copper_ore", KeyError, id="is_not_craftable"),
+        pytest.param("chicken", KeyError, id="is_monster"),
+        pytest.param("fake", KeyError, id="is_fake"),
+    ]
+)
+
+def test__get_workshop_locations_for_item(world_state: WorldState, item, exception):
+    if exception:
+        with pytest.raises(exception):
+            world_state.get_workshop_locations_for_item(item)
+    else:
+        result = world_state.get_workshop_locations_for_item(item)
+        assert result == tuple(world_state.get_workshop_locations(world_state.get_workshop_for_item(item)))
+
 ## Equipment Checkers
 #is_equipment
 @pytest.mark.parametrize(
@@ -448,11 +498,11 @@ def test__get_task_master_locations(world_state: WorldState):
 
 # test
 def test__get_best_loadout_for_fighting(world_state: WorldState):
-    result = world_state.get_best_loadout_for_task({ "hp": 1, "max_hp": 100, "level": 5, "initiative": 100, "inventory": []}, "fighting", "blue_slime")
+    result = world_state.get_best_loadout_for_task({ "hp": 1, "max_hp": 100, "level": 5, "initiative": 100, "inventory": []}, TaskType.FIGHTING, "blue_slime")
     assert result
 
 
 def test__get_best_loadout_for_gathering(world_state: WorldState):
-    result = world_state.get_best_loadout_for_task({ "hp": 1, "max_hp": 100, "level": 5, "initiative": 100, "inventory": []}, "gathering", "iron_ore")
+    result = world_state.get_best_loadout_for_task({ "hp": 1, "max_hp": 100, "level": 5, "initiative": 100, "inventory": []}, TaskType.GATHERING, "iron_ore")
     assert result
     
\ No newline at end of file